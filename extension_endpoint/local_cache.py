@@ -0,0 +1,51 @@
+"""
+In-process cache used in front of the shared Django cache.
+Lets a worker answer repeat per-user lookups from memory without a cache round-trip.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalTTLCache:
+    """
+    Small thread-safe in-process cache with per-entry expiry and a size bound.
+
+    Entries expire after `ttl` seconds (or a shorter per-entry timeout), and the
+    oldest entries are evicted once `maxsize` is reached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, timeout: float | None = None):
+        """Cache value for min(timeout, ttl) seconds."""
+        ttl = self.ttl if timeout is None else min(timeout, self.ttl)
+        if ttl <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove key if present."""
+        with self._lock:
+            self._data.pop(key, None)
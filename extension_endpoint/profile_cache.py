@@ -0,0 +1,30 @@
+"""
+Cache helpers for Ambient profile lookups.
+Kept separate from views so signal handlers can use them without importing
+the API stack (Gemini client, prompt builders, HTTP session).
+"""
+import hashlib
+
+from django.core.cache import cache
+
+from .local_cache import LocalTTLCache
+
+# How long an email -> has-Ambient-profile lookup is cached. Entries are
+# invalidated on CustomUser save/delete (see signals.py).
+AMBIENT_PROFILE_CACHE_TTL = 900
+
+# Per-process L1 in front of the shared cache. Kept short because signal
+# invalidation only reaches the current process.
+local_profile_cache = LocalTTLCache(maxsize=4096, ttl=60)
+
+
+def ambient_profile_cache_key(email: str) -> str:
+    """Cache key for the Ambient profile lookup of an email (case-insensitive)."""
+    return f"ambientprofile:extension:{hashlib.blake2b(email.lower().encode(), digest_size=16).hexdigest()}"
+
+
+def invalidate_ambient_profile(email: str):
+    """Drop the cached Ambient profile lookup for an email (shared and local)."""
+    cache_key = ambient_profile_cache_key(email)
+    cache.delete(cache_key)
+    local_profile_cache.delete(cache_key)
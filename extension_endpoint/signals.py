@@ -0,0 +1,23 @@
+"""
+Signal handlers for extension_endpoint.
+Keeps cached Ambient profile lookups in sync with CustomUser changes.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .profile_cache import invalidate_ambient_profile
+
+
+@receiver(post_save, sender='users.CustomUser')
+@receiver(post_delete, sender='users.CustomUser')
+def invalidate_ambient_profile_cache(sender, instance, **kwargs):
+    """
+    Drop the cached profile lookup for a user's email when they are created,
+    updated, or deleted.
+    
+    If a user changes their email, the entry for the old address expires on
+    its own after AMBIENT_PROFILE_CACHE_TTL. Other worker processes may keep
+    their local copy for up to a minute.
+    """
+    if instance.email:
+        invalidate_ambient_profile(instance.email)
@@ -9,6 +9,7 @@ app_name = 'extension_endpoint'
 urlpatterns = [
     path('extract_event/', views.extract_event, name='extract_event'),
     path('extract_from_file/', views.extract_from_file, name='extract_from_file'),
+    path('extract_from_file/raw/', views.extract_from_file_raw, name='extract_from_file_raw'),
     path('find_matches/', views.find_matches, name='find_matches'),
     path('health/', views.health_check, name='health_check'),
     path('check_profile/', views.check_profile, name='check_profile'),
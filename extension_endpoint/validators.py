@@ -10,6 +10,46 @@ class ValidationError(Exception):
     pass
 
 
+# Payloads are parsed from JSON, so values are always exactly str/dict/list/...
+# and never subclasses; the checks below compare types directly.
+_MESSAGE_REQUIRED_STR = ('date', 'sender', 'text')
+
+_VALID_EVENT_TYPES = frozenset((
+    'full_potential_event_details',
+    'incomplete_event_details',
+    'not_a_desired_event',
+    'not_an_event',
+))
+_INVALID_EVENT_TYPE_ERR = (
+    "Invalid event_type. Must be one of: full_potential_event_details, "
+    "incomplete_event_details, not_a_desired_event, not_an_event"
+)
+
+# Optional date/time fields shared by extracted and calendar events
+_START_END = ('start', 'end')
+
+# Sentinel for single-lookup field access: data.get(k, _MISSING)
+_MISSING = object()
+
+
+def _message_error(idx: int, message) -> Optional[str]:
+    """Return the error for a single conversation message, or None if it is valid."""
+    if type(message) is not dict:
+        return f"Message at index {idx} must be an object"
+    
+    # Check required message fields
+    for field in _MESSAGE_REQUIRED_STR:
+        if field not in message:
+            return f"Message at index {idx} missing required field: {field}"
+    
+    # Validate types
+    for field in _MESSAGE_REQUIRED_STR:
+        if type(message[field]) is not str:
+            return f"Message at index {idx}: '{field}' must be a string"
+    
+    return None
+
+
 def validate_conversation(data: dict) -> Tuple[bool, Optional[str]]:
     """
     Validate a conversation object from the extension.
@@ -31,49 +71,44 @@ def validate_conversation(data: dict) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    if not isinstance(data, dict):
+    if type(data) is not dict:
         return False, "Conversation must be a JSON object"
     
     # Check required fields
-    if 'title' not in data:
+    title = data.get('title', _MISSING)
+    if title is _MISSING:
         return False, "Missing required field: title"
     
-    if not isinstance(data.get('title'), str):
+    if type(title) is not str:
         return False, "Field 'title' must be a string"
     
-    if 'structured_messages' not in data:
+    messages = data.get('structured_messages', _MISSING)
+    if messages is _MISSING:
         return False, "Missing required field: structured_messages"
     
-    if not isinstance(data.get('structured_messages'), list):
+    if type(messages) is not list:
         return False, "Field 'structured_messages' must be an array"
     
     # Validate each message
-    for idx, message in enumerate(data['structured_messages']):
-        if not isinstance(message, dict):
-            return False, f"Message at index {idx} must be an object"
-        
-        # Check required message fields
-        if 'date' not in message:
-            return False, f"Message at index {idx} missing required field: date"
-        if 'sender' not in message:
-            return False, f"Message at index {idx} missing required field: sender"
-        if 'text' not in message:
-            return False, f"Message at index {idx} missing required field: text"
-        
-        # Validate types
-        if not isinstance(message.get('date'), str):
-            return False, f"Message at index {idx}: 'date' must be a string"
-        if not isinstance(message.get('sender'), str):
-            return False, f"Message at index {idx}: 'sender' must be a string"
-        if not isinstance(message.get('text'), str):
-            return False, f"Message at index {idx}: 'text' must be a string"
+    for idx, message in enumerate(messages):
+        # Fast path: a well-formed message passes with a single straight-line
+        # check; the detailed error is only worked out for the failing message
+        if (type(message) is dict
+                and type(message.get('date')) is str
+                and type(message.get('sender')) is str
+                and type(message.get('text')) is str):
+            continue
+        error = _message_error(idx, message)
+        if error:
+            return False, error
     
     # Optional participants validation
-    if 'participants' in data:
-        if not isinstance(data['participants'], list):
+    participants = data.get('participants', _MISSING)
+    if participants is not _MISSING:
+        if type(participants) is not list:
             return False, "Field 'participants' must be an array"
-        for idx, participant in enumerate(data['participants']):
-            if not isinstance(participant, str):
+        for idx, participant in enumerate(participants):
+            if type(participant) is not str:
                 return False, f"Participant at index {idx} must be a string"
     
     return True, None
@@ -104,32 +139,27 @@ def validate_extracted_event(data: dict) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    if not isinstance(data, dict):
+    if type(data) is not dict:
         return False, "Event must be a JSON object"
     
     # Check required fields
-    if 'event_type' not in data:
+    event_type = data.get('event_type', _MISSING)
+    if event_type is _MISSING:
         return False, "Missing required field: event_type"
     
-    valid_event_types = [
-        'full_potential_event_details',
-        'incomplete_event_details',
-        'not_a_desired_event',
-        'not_an_event'
-    ]
-    
-    if data.get('event_type') not in valid_event_types:
-        return False, f"Invalid event_type. Must be one of: {', '.join(valid_event_types)}"
+    # Type check first: unhashable values (lists, dicts) can't be looked up in a set
+    if type(event_type) is not str or event_type not in _VALID_EVENT_TYPES:
+        return False, _INVALID_EVENT_TYPE_ERR
     
     # For matching, we need at least a summary
     if 'summary' not in data:
         return False, "Missing required field: summary"
     
     # Validate date/time structure if present
-    for field in ['start', 'end']:
-        if field in data and data[field] is not None:
-            if not isinstance(data[field], dict):
-                return False, f"Field '{field}' must be an object"
+    for field in _START_END:
+        value = data.get(field)
+        if value is not None and type(value) is not dict:
+            return False, f"Field '{field}' must be an object"
     
     return True, None
 
@@ -158,15 +188,15 @@ def validate_calendar_event(data: dict) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    if not isinstance(data, dict):
+    if type(data) is not dict:
         return False, "Calendar event must be a JSON object"
     
     # Calendar events can be quite sparse, just validate structure
     # Validate date/time structure if present
-    for field in ['start', 'end']:
-        if field in data and data[field] is not None:
-            if not isinstance(data[field], dict):
-                return False, f"Field '{field}' must be an object"
+    for field in _START_END:
+        value = data.get(field)
+        if value is not None and type(value) is not dict:
+            return False, f"Field '{field}' must be an object"
     
     return True, None
 
@@ -184,26 +214,36 @@ def validate_match_request(data: dict) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    if not isinstance(data, dict):
+    if type(data) is not dict:
         return False, "Request must be a JSON object"
     
     # Check required fields
-    if 'event' not in data:
+    event = data.get('event', _MISSING)
+    if event is _MISSING:
         return False, "Missing required field: event"
     
-    if 'calendar_events' not in data:
+    calendar_events = data.get('calendar_events', _MISSING)
+    if calendar_events is _MISSING:
         return False, "Missing required field: calendar_events"
     
-    if not isinstance(data.get('calendar_events'), list):
+    if type(calendar_events) is not list:
         return False, "Field 'calendar_events' must be an array"
     
     # Validate the event
-    is_valid, error = validate_extracted_event(data['event'])
+    is_valid, error = validate_extracted_event(event)
     if not is_valid:
         return False, f"Invalid event: {error}"
     
     # Validate each calendar event
-    for idx, cal_event in enumerate(data['calendar_events']):
+    for idx, cal_event in enumerate(calendar_events):
+        # Fast path: inline the common well-formed case so a long calendar
+        # list costs no per-event function call
+        if type(cal_event) is dict:
+            start = cal_event.get('start')
+            end = cal_event.get('end')
+            if ((start is None or type(start) is dict)
+                    and (end is None or type(end) is dict)):
+                continue
         is_valid, error = validate_calendar_event(cal_event)
         if not is_valid:
             return False, f"Invalid calendar_event at index {idx}: {error}"
@@ -224,24 +264,26 @@ def validate_extract_request(data: dict) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    if not isinstance(data, dict):
+    if type(data) is not dict:
         return False, "Request must be a JSON object"
     
     # Check required fields
-    if 'conversation' not in data:
+    conversation = data.get('conversation', _MISSING)
+    if conversation is _MISSING:
         return False, "Missing required field: conversation"
     
-    if 'user_name' not in data:
+    user_name = data.get('user_name', _MISSING)
+    if user_name is _MISSING:
         return False, "Missing required field: user_name"
     
-    if not isinstance(data.get('user_name'), str):
+    if type(user_name) is not str:
         return False, "Field 'user_name' must be a string"
     
-    if not data.get('user_name').strip():
+    if not user_name.strip():
         return False, "Field 'user_name' cannot be empty"
     
     # Validate the conversation
-    is_valid, error = validate_conversation(data['conversation'])
+    is_valid, error = validate_conversation(conversation)
     if not is_valid:
         return False, f"Invalid conversation: {error}"
     
@@ -250,10 +292,18 @@ def validate_extract_request(data: dict) -> Tuple[bool, Optional[str]]:
 
 MAX_FILE_SIZE_BYTES = 20 * 1024 * 1024  # 20 MB
 
+# Longest base64 string whose estimated decoded size (len * 3 // 4) fits
+# within MAX_FILE_SIZE_BYTES, so the per-request check is a single compare
+_MAX_FILE_DATA_CHARS = (4 * (MAX_FILE_SIZE_BYTES + 1) - 1) // 3
+FILE_TOO_LARGE_ERROR = f"File too large. Maximum size is {MAX_FILE_SIZE_BYTES // (1024 * 1024)} MB"
+
 def validate_file_extract_request(data: dict) -> Tuple[bool, Optional[str]]:
     """
     Validate a file extraction request.
     
+    Only used by the legacy JSON (base64) file endpoint; new clients should
+    upload to extract_from_file/raw/ as multipart/form-data instead.
+    
     Expected format:
     {
         "file_data": str,    # Base64-encoded file content
@@ -264,30 +314,34 @@ def validate_file_extract_request(data: dict) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    if not isinstance(data, dict):
+    if type(data) is not dict:
         return False, "Request must be a JSON object"
 
-    if 'file_data' not in data:
+    file_data = data.get('file_data', _MISSING)
+    if file_data is _MISSING:
         return False, "Missing required field: file_data"
 
-    if not isinstance(data.get('file_data'), str):
+    if type(file_data) is not str:
         return False, "Field 'file_data' must be a base64-encoded string"
 
-    if not data.get('file_data').strip():
-        return False, "Field 'file_data' cannot be empty"
+    # Rough size check on the base64 string (base64 is ~4/3 of original).
+    # Done first so oversized payloads are rejected without scanning the body.
+    if len(file_data) > _MAX_FILE_DATA_CHARS:
+        return False, FILE_TOO_LARGE_ERROR
 
-    # Rough size check on the base64 string (base64 is ~4/3 of original)
-    estimated_size = len(data['file_data']) * 3 // 4
-    if estimated_size > MAX_FILE_SIZE_BYTES:
-        return False, f"File too large. Maximum size is {MAX_FILE_SIZE_BYTES // (1024 * 1024)} MB"
+    # isspace() stops at the first non-whitespace character and, unlike
+    # strip(), never copies the (up to 20 MB) string
+    if not file_data or file_data.isspace():
+        return False, "Field 'file_data' cannot be empty"
 
-    if 'mime_type' not in data:
+    mime_type = data.get('mime_type', _MISSING)
+    if mime_type is _MISSING:
         return False, "Missing required field: mime_type"
 
-    if not isinstance(data.get('mime_type'), str):
+    if type(mime_type) is not str:
         return False, "Field 'mime_type' must be a string"
 
-    if not data.get('mime_type').strip():
+    if not mime_type or mime_type.isspace():
         return False, "Field 'mime_type' cannot be empty"
 
     return True, None
@@ -4,9 +4,15 @@ Provides event extraction and calendar matching via AmbientAI's paid Gemini tier
 """
 import json
 import time
+import random
 import base64
+import hashlib
+import threading
+from datetime import date
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import wraps
 import requests
+from requests.adapters import HTTPAdapter
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
@@ -15,7 +21,19 @@ from django.core.cache import cache
 from google import genai
 from google.genai import types
 
-from .validators import validate_extract_request, validate_match_request, validate_file_extract_request
+from .local_cache import LocalTTLCache
+from .profile_cache import (
+    AMBIENT_PROFILE_CACHE_TTL,
+    ambient_profile_cache_key,
+    local_profile_cache,
+)
+from .validators import (
+    validate_extract_request,
+    validate_match_request,
+    validate_file_extract_request,
+    MAX_FILE_SIZE_BYTES,
+    FILE_TOO_LARGE_ERROR,
+)
 from autoscheduler.core.text_extraction.text_extraction_examples import (
     format_conversation_for_event_extraction,
     get_text_event_extraction_instructions
@@ -25,48 +43,126 @@ from autoscheduler.core.matches.v2_event_match_instructions_and_examples import
 )
 from json_utils import sanitize_and_parse_json
 
+# orjson is optional; when installed it decodes the (potentially large) request
+# bodies several times faster than the stdlib parser. Its JSONDecodeError
+# subclasses json.JSONDecodeError, so error handling is the same either way.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # Model to use for API calls
 DEFAULT_MODEL = "gemini-2.0-flash"
 
+# Retry backoff for transient Gemini errors (seconds)
+GEMINI_RETRY_BASE_DELAY = 0.5
+GEMINI_RETRY_MAX_DELAY = 8.0
+
+# Calendar candidate shortlisting for find_matches: when more than
+# MATCH_SHORTLIST_MIN_EVENTS calendar events are sent, only those starting within
+# MATCH_CANDIDATE_WINDOW_DAYS of the extracted event are put in the prompt
+MATCH_SHORTLIST_MIN_EVENTS = 50
+MATCH_CANDIDATE_WINDOW_DAYS = 7
+
+# Max seconds a duplicate request waits on an identical in-flight Gemini call
+GEMINI_SINGLE_FLIGHT_TIMEOUT = 120
+
 # Allowed origins for CORS
 # NOTE: If the Chrome extension ID changes (e.g., when publishing to Chrome Web Store),
 # update the extension ID here and in any other locations that reference it.
-ALLOWED_ORIGINS = [
+ALLOWED_ORIGINS = frozenset([
     'chrome-extension://lmmjfddkgnehcnhelddgmlmookgemeop',  # Ambient Chrome extension
     'https://messages.google.com',
     'https://www.messenger.com',
     'https://web.whatsapp.com',
-]
+])
 
 # Google OAuth client IDs for the Ambient extension
 # This is used to verify that tokens were issued for our extension
 # We accept both old and new client IDs during transition
-GOOGLE_CLIENT_IDS = [
+GOOGLE_CLIENT_IDS = frozenset([
     '636710672879-biss5lra11l6ho1624m4b9kujmo2u3vb.apps.googleusercontent.com',  # New public extension
     '636710672879-jtimq18mggv3ev79itq5uq0f1tpdmf5d.apps.googleusercontent.com',  # Legacy extension
-]
+])
+
+# Bearer token parsing
+BEARER_PREFIX = 'Bearer '
+MIN_TOKEN_LENGTH = 20
 
 # Rate limiting configuration
 RATE_LIMIT_REQUESTS_DEFAULT = 5   # Max requests per window for users without Ambient profile
 RATE_LIMIT_REQUESTS_AMBIENT = 10  # Max requests per window for users with Ambient profile
 RATE_LIMIT_WINDOW = 86400         # Window size in seconds (24 hours / 1 day)
 
+# How long a verified Google token is trusted before re-checking with Google.
+# Kept well below the 1 hour access token lifetime.
+GOOGLE_TOKEN_CACHE_TTL = 600
+
+# Per-process L1 cache in front of the shared Django cache, so repeat requests
+# from the same user on a worker skip the cache round-trip. The profile L1
+# lives in profile_cache.py.
+_local_token_cache = LocalTTLCache(maxsize=4096, ttl=300)
+
+# Shared HTTP session for Google token checks, so TLS connections to
+# googleapis.com are kept alive and reused across requests
+_google_session = requests.Session()
+_google_session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
+# Runs the tokeninfo call alongside userinfo so verification takes max(t1, t2)
+_google_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='google-token')
+
+# Request body limits for the file endpoints, checked against Content-Length
+# before auth or body parsing. Both allow 64 KB for form/JSON framing.
+MAX_RAW_UPLOAD_BYTES = MAX_FILE_SIZE_BYTES + 64 * 1024               # multipart upload
+MAX_JSON_UPLOAD_BYTES = MAX_FILE_SIZE_BYTES * 4 // 3 + 64 * 1024     # base64 in JSON
+
 
 def verify_google_token(token: str) -> dict | None:
     """
     Verify a Google OAuth token and return user info.
     
-    Makes two API calls:
+    Makes two API calls, concurrently:
     1. userinfo - to get the user's stable ID (sub claim)
     2. tokeninfo - to verify the token was issued for our client_id
     
+    Successful verifications are cached (keyed by a hash of the token, never
+    the token itself) for GOOGLE_TOKEN_CACHE_TTL seconds, capped at the
+    token's remaining lifetime, so repeat requests skip both calls. Lookups
+    check the in-process cache first, then the shared cache.
+    
     Returns:
-        {'sub': '110248495921238986420', ...} on success
+        {'sub': '110248495921238986420', 'email': ...} on success
         None on failure
     """
     try:
+        cache_key = f"gtoken:extension:{hashlib.blake2b(token.encode(), digest_size=16).hexdigest()}"
+        
+        cached_userinfo = _local_token_cache.get(cache_key)
+        if cached_userinfo is not None:
+            return cached_userinfo
+        
+        # Shared cache entries carry their expiry so the local copy never
+        # outlives the token
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached_userinfo, expires_at = cached
+            remaining = expires_at - time.time()
+            if remaining > 0:
+                _local_token_cache.set(cache_key, cached_userinfo, timeout=remaining)
+                return cached_userinfo
+        
+        # Verify the token was issued for OUR extension's client_id
+        # This prevents someone from using a token from a different app
+        # (started first so it runs while we fetch userinfo)
+        tokeninfo_future = _google_executor.submit(
+            _google_session.get,
+            f'https://oauth2.googleapis.com/tokeninfo?access_token={token}',
+            timeout=5
+        )
+        
         # Get user info (includes 'sub' - the stable user ID)
-        userinfo_response = requests.get(
+        userinfo_response = _google_session.get(
             'https://www.googleapis.com/oauth2/v3/userinfo',
             headers={'Authorization': f'Bearer {token}'},
             timeout=5
@@ -80,12 +176,9 @@ def verify_google_token(token: str) -> dict | None:
         if 'sub' not in userinfo:
             return None
         
-        # Verify the token was issued for OUR extension's client_id
-        # This prevents someone from using a token from a different app
-        tokeninfo_response = requests.get(
-            f'https://oauth2.googleapis.com/tokeninfo?access_token={token}',
-            timeout=5
-        )
+        # Bound the wait: the task may still be queued behind other checks
+        # on the executor, where the requests timeout hasn't started yet
+        tokeninfo_response = tokeninfo_future.result(timeout=5)
         
         if tokeninfo_response.status_code != 200:
             return None
@@ -95,7 +188,19 @@ def verify_google_token(token: str) -> dict | None:
         if tokeninfo.get('aud') not in GOOGLE_CLIENT_IDS:
             return None
         
-        return userinfo
+        # Only keep the fields the endpoints use
+        verified = {'sub': userinfo['sub'], 'email': userinfo.get('email', '')}
+        
+        try:
+            expires_in = int(tokeninfo.get('expires_in', GOOGLE_TOKEN_CACHE_TTL))
+        except (TypeError, ValueError):
+            expires_in = GOOGLE_TOKEN_CACHE_TTL
+        timeout = min(GOOGLE_TOKEN_CACHE_TTL, expires_in)
+        if timeout > 0:
+            cache.set(cache_key, (verified, time.time() + timeout), timeout=timeout)
+            _local_token_cache.set(cache_key, verified, timeout=timeout)
+        
+        return verified
         
     except requests.Timeout:
         return None
@@ -107,6 +212,9 @@ def check_ambient_profile(email: str) -> bool:
     """
     Check if a user has an Ambient profile by matching their Google email.
     
+    The result is cached for AMBIENT_PROFILE_CACHE_TTL seconds (in-process
+    first, then the shared cache) so repeat requests don't hit the database.
+    
     Args:
         email: The user's email from Google OAuth
         
@@ -117,9 +225,24 @@ def check_ambient_profile(email: str) -> bool:
         return False
     
     try:
+        cache_key = ambient_profile_cache_key(email)
+        
+        cached = local_profile_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        cached = cache.get(cache_key)
+        if cached is not None:
+            local_profile_cache.set(cache_key, cached)
+            return cached
+        
         from users.models import CustomUser
         # Case-insensitive email lookup
-        return CustomUser.objects.filter(email__iexact=email).exists()
+        is_ambient_user = CustomUser.objects.filter(email__iexact=email).exists()
+        
+        cache.set(cache_key, is_ambient_user, timeout=AMBIENT_PROFILE_CACHE_TTL)
+        local_profile_cache.set(cache_key, is_ambient_user)
+        return is_ambient_user
     except Exception:
         return False
 
@@ -128,6 +251,9 @@ def check_rate_limit(user_id: str, is_ambient_user: bool = False) -> tuple[bool,
     """
     Check if a user is within their rate limit.
     
+    Requires a cache backend with atomic, TTL-preserving incr() (Redis or
+    memcached); see the note below.
+    
     Args:
         user_id: Google user ID (sub claim)
         is_ambient_user: Whether user has an Ambient profile (gets higher limit)
@@ -140,17 +266,70 @@ def check_rate_limit(user_id: str, is_ambient_user: bool = False) -> tuple[bool,
     # Determine limit based on profile status
     limit = RATE_LIMIT_REQUESTS_AMBIENT if is_ambient_user else RATE_LIMIT_REQUESTS_DEFAULT
     
-    current_count = cache.get(cache_key, 0)
-    remaining = limit - current_count
+    # NOTE: This requires a cache backend with a native, TTL-preserving incr()
+    # (Redis or memcached in production; locmem for development). On those,
+    # incr() is atomic, leaves the window's TTL alone, and is a single cache
+    # round-trip in the steady state. The database and file backends fall back
+    # to Django's BaseCache.incr(), a non-atomic get + set that re-sets the key
+    # with the default TIMEOUT and so shrinks the 24 h window on every request.
+    try:
+        count = cache.incr(cache_key)
+    except ValueError:
+        # No counter yet: this request opens the window. add() only writes if
+        # the key is still missing, so a concurrent opener isn't overwritten.
+        if cache.add(cache_key, 1, timeout=RATE_LIMIT_WINDOW):
+            count = 1
+        else:
+            count = cache.incr(cache_key)
     
-    if current_count >= limit:
+    # Rejected requests still increment the counter; that's harmless since it
+    # is only compared against the limit and expires with the window
+    if count > limit:
         return False, 0, limit
     
-    # Increment counter (set TTL on first request)
-    new_count = current_count + 1
-    cache.set(cache_key, new_count, timeout=RATE_LIMIT_WINDOW)
+    return True, limit - count, limit
+
+
+def _extract_bearer(auth_header: str) -> tuple[str | None, str | None]:
+    """
+    Extract the bearer token from an Authorization header.
+    
+    Malformed headers are rejected on prefix and length alone, before the
+    token is sliced out.
+    
+    Returns:
+        (token, None) on success
+        (None, error_message) on failure
+    """
+    if not auth_header.startswith(BEARER_PREFIX):
+        return None, 'Missing or invalid Authorization header'
+    
+    if len(auth_header) < len(BEARER_PREFIX) + MIN_TOKEN_LENGTH:
+        return None, 'Invalid token format'
     
-    return True, remaining - 1, limit
+    return auth_header[len(BEARER_PREFIX):], None
+
+
+def _authenticate(request) -> tuple[dict | None, str | None]:
+    """
+    Verify the Google bearer token on a request.
+    
+    Shared by require_google_auth and check_profile so every endpoint goes
+    through the same cached verification path.
+    
+    Returns:
+        (userinfo, None) on success
+        (None, error_message) on failure
+    """
+    token, error = _extract_bearer(request.headers.get('Authorization', ''))
+    if error:
+        return None, error
+    
+    userinfo = verify_google_token(token)
+    if not userinfo:
+        return None, 'Invalid or expired Google token. Please reconnect your calendar.'
+    
+    return userinfo, None
 
 
 def require_google_auth(view_func):
@@ -169,34 +348,13 @@ def require_google_auth(view_func):
         if request.method == 'OPTIONS':
             return view_func(request, *args, **kwargs)
         
-        # Extract token from Authorization header
-        auth_header = request.headers.get('Authorization', '')
+        # Extract and verify the Google token
+        userinfo, error = _authenticate(request)
         
-        if not auth_header.startswith('Bearer '):
+        if error:
             return JsonResponse({
                 'success': False,
-                'error': 'Missing or invalid Authorization header',
-                'events': None,
-                'match_result': None,
-            }, status=401)
-        
-        token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        if not token or len(token) < 20:
-            return JsonResponse({
-                'success': False,
-                'error': 'Invalid token format',
-                'events': None,
-                'match_result': None,
-            }, status=401)
-        
-        # Verify token with Google
-        userinfo = verify_google_token(token)
-        
-        if not userinfo:
-            return JsonResponse({
-                'success': False,
-                'error': 'Invalid or expired Google token. Please reconnect your calendar.',
+                'error': error,
                 'events': None,
                 'match_result': None,
             }, status=401)
@@ -241,6 +399,36 @@ def require_google_auth(view_func):
     return wrapper
 
 
+def limit_content_length(max_bytes: int):
+    """
+    Decorator that rejects requests whose Content-Length exceeds max_bytes.
+    
+    Runs before authentication and before the body is read, so oversized
+    uploads never cost a Google token check or get parsed into memory.
+    
+    On failure: Returns 413 JsonResponse
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            try:
+                content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                content_length = 0
+            
+            if content_length > max_bytes:
+                return JsonResponse({
+                    'success': False,
+                    'error': FILE_TOO_LARGE_ERROR,
+                    'events': None,
+                    'match_result': None,
+                }, status=413)
+            
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 def get_cors_origin(request):
     """
     Get the appropriate CORS origin for the request.
@@ -248,12 +436,8 @@ def get_cors_origin(request):
     """
     origin = request.headers.get('Origin', '')
     
-    # Allow only specific origins
-    if origin in ALLOWED_ORIGINS:
-        return origin
-    
-    # No match - return None (no CORS header will be set)
-    return None
+    # Allow only specific origins (no match - no CORS header will be set)
+    return origin if origin in ALLOWED_ORIGINS else None
 
 
 def add_cors_headers(response, origin):
@@ -287,6 +471,136 @@ def get_api_key():
     return api_key
 
 
+_genai_client = None
+_genai_client_lock = threading.Lock()
+
+
+def get_genai_client():
+    """
+    Get the shared Gemini client, creating it on first use.
+    
+    Reusing one client keeps its HTTP connection pool (and TLS sessions to
+    the Gemini API) alive across requests.
+    
+    Raises:
+        ValueError if DEFAULT_API_KEY is not configured
+    """
+    global _genai_client
+    if _genai_client is None:
+        with _genai_client_lock:
+            if _genai_client is None:
+                _genai_client = genai.Client(api_key=get_api_key())
+    return _genai_client
+
+
+def _retry_delay(attempt: int) -> float:
+    """
+    Seconds to wait before retrying a Gemini call.
+    
+    Exponential backoff with full jitter, so workers that hit the same
+    upstream error don't retry in lockstep.
+    """
+    return random.uniform(0, min(GEMINI_RETRY_MAX_DELAY, GEMINI_RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+_inflight_gemini_calls: dict[str, Future] = {}
+_inflight_gemini_lock = threading.Lock()
+
+
+def _request_digest(endpoint: str, body: bytes) -> str:
+    """Short digest identifying identical request bodies sent to an endpoint."""
+    return f"{endpoint}:{hashlib.blake2b(body, digest_size=16).hexdigest()}"
+
+
+def _single_flight(key: str, fn):
+    """
+    Run fn() at most once at a time per key within this process.
+    
+    Concurrent callers with the same key (e.g. a user re-clicking "extract"
+    on the same conversation) wait for the in-flight call and share its
+    result instead of issuing a duplicate Gemini request. Nothing is kept
+    once the call finishes.
+    
+    Raises:
+        Whatever fn() raised, for the caller and all waiters
+        TimeoutError if a waiter gives up after GEMINI_SINGLE_FLIGHT_TIMEOUT
+    """
+    with _inflight_gemini_lock:
+        future = _inflight_gemini_calls.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight_gemini_calls[key] = future
+    
+    if not is_owner:
+        return future.result(timeout=GEMINI_SINGLE_FLIGHT_TIMEOUT)
+    
+    try:
+        result = fn()
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_gemini_lock:
+            _inflight_gemini_calls.pop(key, None)
+
+
+def _parse_ai_response(response_text):
+    """
+    Parse a Gemini JSON response.
+    
+    We request response_mime_type application/json, so the text is almost
+    always valid JSON and a plain parse is enough. Only fall back to
+    sanitize_and_parse_json (which repairs malformed output) when that fails.
+    """
+    try:
+        return _json_loads(response_text)
+    except Exception:
+        return sanitize_and_parse_json(response_text, can_log=False)
+
+
+def _event_start_date(event: dict) -> date | None:
+    """Start date (ignoring time and timezone) of an event, or None if unknown."""
+    start = event.get('start')
+    if not isinstance(start, dict):
+        return None
+    value = start.get('dateTime') or start.get('date')
+    if not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _shortlist_calendar_events(event: dict, calendar_events: list) -> list:
+    """
+    Narrow the calendar events sent to Gemini for matching.
+    
+    Prompt size (and Gemini cost/latency) grows with every calendar event, so
+    for large lists only events starting within MATCH_CANDIDATE_WINDOW_DAYS of
+    the extracted event are kept. The window is wide enough to still catch
+    rescheduled events. Calendar events without a parseable start are always
+    kept, and nothing is filtered if the extracted event has no start date.
+    """
+    if len(calendar_events) <= MATCH_SHORTLIST_MIN_EVENTS:
+        return calendar_events
+    
+    event_date = _event_start_date(event)
+    if event_date is None:
+        return calendar_events
+    
+    shortlist = []
+    for cal_event in calendar_events:
+        cal_date = _event_start_date(cal_event)
+        if cal_date is None or abs((cal_date - event_date).days) <= MATCH_CANDIDATE_WINDOW_DAYS:
+            shortlist.append(cal_event)
+    return shortlist
+
+
 def call_gemini_with_retry(client, model_name: str, prompt: str, config: dict, max_retries: int = 3):
     """
     Call Gemini API with retry logic for transient errors.
@@ -313,20 +627,19 @@ def call_gemini_with_retry(client, model_name: str, prompt: str, config: dict, m
             )
             
             # Check for error strings in response text
-            if response.text:
-                if "Error processing request: 500 INTERNAL." in response.text:
-                    time.sleep(attempt + 1)
-                    continue
-                if "503 UNAVAILABLE." in response.text:
-                    time.sleep(attempt + 1)
-                    continue
+            if response.text and (
+                "Error processing request: 500 INTERNAL." in response.text
+                or "503 UNAVAILABLE." in response.text
+            ):
+                time.sleep(_retry_delay(attempt))
+                continue
             
             return response.text
             
         except Exception as e:
             error_msg = str(e)
             if any(code in error_msg for code in ["500", "503", "UNAVAILABLE", "INTERNAL"]):
-                time.sleep(attempt + 1)
+                time.sleep(_retry_delay(attempt))
                 if attempt == max_retries - 1:
                     raise Exception(f"Gemini API error after {max_retries} attempts: {error_msg}")
             else:
@@ -371,7 +684,7 @@ def extract_event(request):
     try:
         # Parse request body
         try:
-            data = json.loads(request.body)
+            data = _json_loads(request.body)
         except json.JSONDecodeError as e:
             return JsonResponse({
                 "success": False,
@@ -391,26 +704,36 @@ def extract_event(request):
         conversation = data['conversation']
         user_name = data['user_name'].strip()
         
+        # If there is no message text at all, there is nothing to extract
+        if not any(message['text'].strip() for message in conversation['structured_messages']):
+            return JsonResponse({
+                "success": True,
+                "events": [],
+                "error": None,
+                "is_ambient_user": request.is_ambient_user
+            })
+        
         # Build the prompt using existing extraction logic
         # Note: We pass None for user since extension users don't have Django accounts
         instructions = get_text_event_extraction_instructions(user_name, user=None)
         formatted_input = format_conversation_for_event_extraction(conversation)
         prompt = instructions + formatted_input
         
-        # Get API key and create client
-        api_key = get_api_key()
-        client = genai.Client(api_key=api_key)
+        client = get_genai_client()
         
         config = {
             "response_mime_type": "application/json",
         }
         
-        # Call Gemini
-        response_text = call_gemini_with_retry(client, DEFAULT_MODEL, prompt, config)
+        # Call Gemini (identical concurrent requests share one call)
+        response_text = _single_flight(
+            _request_digest('extract_event', request.body),
+            lambda: call_gemini_with_retry(client, DEFAULT_MODEL, prompt, config)
+        )
         
         # Parse the response
         try:
-            parsed_events = sanitize_and_parse_json(response_text, can_log=False)
+            parsed_events = _parse_ai_response(response_text)
         except Exception as e:
             return JsonResponse({
                 "success": False,
@@ -453,6 +776,9 @@ def find_matches(request):
     """
     Match an extracted event against calendar events using Gemini AI.
     
+    Large calendar lists are first narrowed to events near the extracted
+    event's start date (see _shortlist_calendar_events).
+    
     POST /extension_endpoint/find_matches/
     
     Headers:
@@ -490,7 +816,7 @@ def find_matches(request):
     try:
         # Parse request body
         try:
-            data = json.loads(request.body)
+            data = _json_loads(request.body)
         except json.JSONDecodeError as e:
             return JsonResponse({
                 "success": False,
@@ -508,7 +834,7 @@ def find_matches(request):
             }, status=400)
         
         event = data['event']
-        calendar_events = data['calendar_events']
+        calendar_events = _shortlist_calendar_events(event, data['calendar_events'])
         
         # If no calendar events to match against, return no_match immediately
         if len(calendar_events) == 0:
@@ -531,20 +857,21 @@ def find_matches(request):
             calendar_input=calendar_events
         )
         
-        # Get API key and create client
-        api_key = get_api_key()
-        client = genai.Client(api_key=api_key)
+        client = get_genai_client()
         
         config = {
             "response_mime_type": "application/json",
         }
         
-        # Call Gemini
-        response_text = call_gemini_with_retry(client, DEFAULT_MODEL, prompt, config)
+        # Call Gemini (identical concurrent requests share one call)
+        response_text = _single_flight(
+            _request_digest('find_matches', request.body),
+            lambda: call_gemini_with_retry(client, DEFAULT_MODEL, prompt, config)
+        )
         
         # Parse the response
         try:
-            match_result = sanitize_and_parse_json(response_text, can_log=False)
+            match_result = _parse_ai_response(response_text)
         except Exception as e:
             return JsonResponse({
                 "success": False,
@@ -608,20 +935,19 @@ def call_gemini_multimodal_with_retry(client, model_name: str, contents: list, c
                 config=config
             )
             
-            if response.text:
-                if "Error processing request: 500 INTERNAL." in response.text:
-                    time.sleep(attempt + 1)
-                    continue
-                if "503 UNAVAILABLE." in response.text:
-                    time.sleep(attempt + 1)
-                    continue
+            if response.text and (
+                "Error processing request: 500 INTERNAL." in response.text
+                or "503 UNAVAILABLE." in response.text
+            ):
+                time.sleep(_retry_delay(attempt))
+                continue
             
             return response.text
             
         except Exception as e:
             error_msg = str(e)
             if any(code in error_msg for code in ["500", "503", "UNAVAILABLE", "INTERNAL"]):
-                time.sleep(attempt + 1)
+                time.sleep(_retry_delay(attempt))
                 if attempt == max_retries - 1:
                     raise Exception(f"Gemini API error after {max_retries} attempts: {error_msg}")
             else:
@@ -630,8 +956,49 @@ def call_gemini_multimodal_with_retry(client, model_name: str, contents: list, c
     raise Exception("Gemini API error: max retries exceeded")
 
 
+def _extract_events_from_file_bytes(request, file_bytes: bytes, mime_type: str):
+    """
+    Run multimodal event extraction on decoded file bytes.
+    
+    Shared by the JSON (base64) and multipart file endpoints. Errors propagate
+    to the calling view's exception handlers.
+    """
+    client = get_genai_client()
+    
+    config = {
+        "response_mime_type": "application/json",
+    }
+    
+    contents = [
+        types.Part.from_bytes(data=file_bytes, mime_type=mime_type),
+        FILE_EXTRACTION_PROMPT,
+    ]
+    
+    response_text = call_gemini_multimodal_with_retry(client, DEFAULT_MODEL, contents, config)
+    
+    try:
+        parsed_events = _parse_ai_response(response_text)
+    except Exception as e:
+        return JsonResponse({
+            "success": False,
+            "events": None,
+            "error": f"Failed to parse AI response: {str(e)}"
+        }, status=500)
+    
+    if isinstance(parsed_events, dict):
+        parsed_events = [parsed_events]
+    
+    return JsonResponse({
+        "success": True,
+        "events": parsed_events,
+        "error": None,
+        "is_ambient_user": request.is_ambient_user
+    })
+
+
 @csrf_exempt
 @cors_exempt
+@limit_content_length(MAX_JSON_UPLOAD_BYTES)
 @require_google_auth
 @require_http_methods(["POST", "OPTIONS"])
 def extract_from_file(request):
@@ -659,7 +1026,7 @@ def extract_from_file(request):
     """
     try:
         try:
-            data = json.loads(request.body)
+            data = _json_loads(request.body)
         except json.JSONDecodeError as e:
             return JsonResponse({
                 "success": False,
@@ -687,38 +1054,85 @@ def extract_from_file(request):
                 "error": f"Invalid base64 data: {str(e)}"
             }, status=400)
         
-        api_key = get_api_key()
-        client = genai.Client(api_key=api_key)
+        return _extract_events_from_file_bytes(request, file_bytes, mime_type)
         
-        config = {
-            "response_mime_type": "application/json",
-        }
+    except ValueError as e:
+        return JsonResponse({
+            "success": False,
+            "events": None,
+            "error": str(e)
+        }, status=500)
         
-        contents = [
-            types.Part.from_bytes(data=file_bytes, mime_type=mime_type),
-            FILE_EXTRACTION_PROMPT,
-        ]
+    except Exception as e:
+        return JsonResponse({
+            "success": False,
+            "events": None,
+            "error": f"Internal error: {str(e)}"
+        }, status=500)
+
+
+@csrf_exempt
+@cors_exempt
+@limit_content_length(MAX_RAW_UPLOAD_BYTES)
+@require_google_auth
+@require_http_methods(["POST", "OPTIONS"])
+def extract_from_file_raw(request):
+    """
+    Extract events from an uploaded file sent as multipart/form-data.
+    
+    Same as extract_from_file, but the file is sent as raw bytes instead of
+    base64 inside JSON, so the body is never decoded as a JSON string.
+    
+    POST /extension_endpoint/extract_from_file/raw/
+    
+    Headers:
+        Authorization: Bearer <google_oauth_token>
+    
+    Form fields:
+        file: the file part
+        mime_type: str (optional, defaults to the file part's content type)
+    
+    Response:
+    {
+        "success": bool,
+        "events": [...] or null,
+        "error": str or null
+    }
+    """
+    try:
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is None:
+            return JsonResponse({
+                "success": False,
+                "events": None,
+                "error": "Missing required file part: file"
+            }, status=400)
         
-        response_text = call_gemini_multimodal_with_retry(client, DEFAULT_MODEL, contents, config)
+        if uploaded_file.size > MAX_FILE_SIZE_BYTES:
+            return JsonResponse({
+                "success": False,
+                "events": None,
+                "error": FILE_TOO_LARGE_ERROR
+            }, status=413)
         
-        try:
-            parsed_events = sanitize_and_parse_json(response_text, can_log=False)
-        except Exception as e:
+        if not uploaded_file.size:
             return JsonResponse({
                 "success": False,
                 "events": None,
-                "error": f"Failed to parse AI response: {str(e)}"
-            }, status=500)
+                "error": "File part 'file' cannot be empty"
+            }, status=400)
         
-        if isinstance(parsed_events, dict):
-            parsed_events = [parsed_events]
+        mime_type = (request.POST.get('mime_type') or uploaded_file.content_type or '').strip()
+        if not mime_type:
+            return JsonResponse({
+                "success": False,
+                "events": None,
+                "error": "Field 'mime_type' cannot be empty"
+            }, status=400)
         
-        return JsonResponse({
-            "success": True,
-            "events": parsed_events,
-            "error": None,
-            "is_ambient_user": request.is_ambient_user
-        })
+        file_bytes = uploaded_file.read()
+        
+        return _extract_events_from_file_bytes(request, file_bytes, mime_type)
         
     except ValueError as e:
         return JsonResponse({
@@ -785,36 +1199,15 @@ def check_profile(request):
     if request.method == 'OPTIONS':
         return HttpResponse()
     
-    # Extract token from Authorization header
-    auth_header = request.headers.get('Authorization', '')
+    # Extract and verify the Google token (same cached path as require_google_auth)
+    userinfo, error = _authenticate(request)
     
-    if not auth_header.startswith('Bearer '):
-        return JsonResponse({
-            'success': False,
-            'is_ambient_user': False,
-            'email': None,
-            'error': 'Missing or invalid Authorization header',
-        }, status=401)
-    
-    token = auth_header[7:]  # Remove 'Bearer ' prefix
-    
-    if not token or len(token) < 20:
-        return JsonResponse({
-            'success': False,
-            'is_ambient_user': False,
-            'email': None,
-            'error': 'Invalid token format',
-        }, status=401)
-    
-    # Verify token with Google
-    userinfo = verify_google_token(token)
-    
-    if not userinfo:
+    if error:
         return JsonResponse({
             'success': False,
             'is_ambient_user': False,
             'email': None,
-            'error': 'Invalid or expired Google token. Please reconnect your calendar.',
+            'error': error,
         }, status=401)
     
     user_email = userinfo.get('email', '')